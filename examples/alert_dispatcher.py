@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Severity-Priority Alert Dispatcher
+----------------------------------
+Makes sure critical alerts get ticketed first, even in an alert storm.
+
+Actionable alerts are pushed onto a priority queue keyed on severity (ranked
+by the order of jira_config.priority_mapping) and alert age, and a small pool
+of workers pulls the most urgent alert off the queue each time. A few workers
+are reserved for critical alerts only, so a critical alert never waits behind
+a backlog of high-severity tickets. Time-to-ticket is tracked per severity
+class so you can hold a latency SLO for the alerts that matter most.
+
+Usage:
+    dispatcher = SeverityDispatcher(triage.create_jira_ticket,
+                                    priority_mapping=config['jira_config']['priority_mapping'])
+    for alert in alerts:
+        if triage.is_actionable(alert):
+            dispatcher.submit(alert)
+    report = dispatcher.close()
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITY_MAPPING = {
+    'critical': 'Highest',
+    'high': 'High',
+    'medium': 'Medium',
+    'low': 'Low'
+}
+
+
+def alert_epoch(alert, default=None):
+    """
+    Best-effort alert detection time in epoch seconds.
+
+    Understands the Sumo Logic 'timestamp' (epoch milliseconds) and the
+    Splunk '_time' (ISO 8601) fields. Falls back to default when neither
+    can be parsed.
+    """
+    for field in ('timestamp', '_time'):
+        value = alert.get(field)
+        if value in (None, ''):
+            continue
+        try:
+            number = float(value)
+            # Epoch milliseconds are 13 digits today, epoch seconds are 10
+            return number / 1000 if number > 1e11 else number
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            pass
+    return default
+
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class SeverityDispatcher:
+    """
+    Priority-queue dispatcher that hands the most urgent alert to the next free worker.
+
+    Alerts are ordered by severity rank first and detection time second, so the
+    oldest critical alert always goes out next. Because workers start ticketing
+    while the caller is still evaluating alerts, a critical alert submitted late
+    jumps ahead of every lower-severity alert still waiting in the queue.
+    Tickets already being created are never interrupted.
+    """
+
+    def __init__(self, handler, priority_mapping=None, workers=4,
+                 reserved_critical_workers=1, critical_slo_seconds=None):
+        """
+        Args:
+            handler (callable): Called with each alert; a truthy return means the ticket was created
+            priority_mapping (dict): Severity -> Jira priority, most urgent first
+                (default: critical, high, medium, low)
+            workers (int): Total number of dispatch workers
+            reserved_critical_workers (int): Workers that only ever take critical alerts
+            critical_slo_seconds (float): Time-to-ticket target for critical alerts
+        """
+        self.handler = handler
+        self.severity_ranks = {
+            severity.lower(): rank
+            for rank, severity in enumerate(priority_mapping or DEFAULT_PRIORITY_MAPPING)
+        }
+        self.critical_slo_seconds = critical_slo_seconds
+
+        workers = max(1, int(workers))
+        # At least one general worker must remain, or lower severities would starve
+        reserved_critical_workers = max(0, min(int(reserved_critical_workers), workers - 1))
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._in_flight = 0
+        self._stats_lock = threading.Lock()
+        self._latencies = {}
+        self._succeeded = 0
+        self._failed = 0
+
+        self._workers = [
+            threading.Thread(
+                target=self._work,
+                args=(index < reserved_critical_workers,),
+                name=f"alert-dispatch-{index}",
+                daemon=True
+            )
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def severity_rank(self, alert):
+        """Rank of an alert's severity; 0 is the most urgent, unknown severities go last."""
+        return self._rank_of(str(alert.get('severity', '')).lower())
+
+    def _rank_of(self, severity):
+        return self.severity_ranks.get(severity, len(self.severity_ranks))
+
+    def submit(self, alert, submitted_at=None):
+        """
+        Queue an alert for ticketing. Never blocks on ticket creation.
+
+        Args:
+            alert (dict): The actionable alert
+            submitted_at (float): Epoch seconds the alert entered the pipeline
+                (default: now), so time spent in an upstream queue counts
+                toward time-to-ticket
+        """
+        if submitted_at is None:
+            submitted_at = time.time()
+        entry = (
+            self.severity_rank(alert),
+            alert_epoch(alert, default=time.time()),
+            next(self._sequence),
+            submitted_at,
+            alert
+        )
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot submit alerts to a closed dispatcher")
+            heapq.heappush(self._queue, entry)
+            self._condition.notify_all()
+
+    def outstanding(self):
+        """Alerts queued or being ticketed right now."""
+        with self._condition:
+            return len(self._queue) + self._in_flight
+
+    def wait_for_capacity(self, limit, timeout=None):
+        """
+        Block until fewer than limit alerts are outstanding, or timeout passes.
+
+        Returns:
+            bool: True if there is room for more alerts
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: len(self._queue) + self._in_flight < limit, timeout
+            )
+
+    def close(self, cancel_pending=False):
+        """
+        Stop accepting alerts, wait for the workers to finish and report results.
+
+        Args:
+            cancel_pending (bool): Drop alerts that have not started yet instead of
+                ticketing them. Tickets already being created always finish first.
+
+        Returns:
+            dict: succeeded/failed counts, cancelled alerts and time-to-ticket
+                stats per severity
+        """
+        with self._condition:
+            self._closed = True
+            cancelled = []
+            if cancel_pending:
+                cancelled = [entry[-1] for entry in sorted(self._queue)]
+                self._queue = []
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+        report = {
+            'succeeded': self._succeeded,
+            'failed': self._failed,
+            'cancelled': cancelled,
+            'time_to_ticket': {}
+        }
+        for severity, latencies in sorted(self._latencies.items(),
+                                          key=lambda item: self._rank_of(item[0])):
+            report['time_to_ticket'][severity] = {
+                'count': len(latencies),
+                'p50': _percentile(latencies, 0.50),
+                'p95': _percentile(latencies, 0.95),
+                'max': max(latencies)
+            }
+        return report
+
+    def log_report(self, report):
+        """Log time-to-ticket per severity class and check the critical SLO."""
+        logger.info("Time-to-ticket by severity (seconds):")
+        for severity, stats in report['time_to_ticket'].items():
+            logger.info(
+                f"  {severity.upper():<10} count={stats['count']:<5} "
+                f"p50={stats['p50']:.2f} p95={stats['p95']:.2f} max={stats['max']:.2f}"
+            )
+
+        if self.critical_slo_seconds is None:
+            return
+        critical = next(
+            (severity for severity, rank in self.severity_ranks.items() if rank == 0), None
+        )
+        stats = report['time_to_ticket'].get(critical)
+        if not stats:
+            return
+        if stats['p95'] > self.critical_slo_seconds:
+            logger.warning(
+                f"Critical time-to-ticket SLO missed: p95 {stats['p95']:.2f}s "
+                f"> {self.critical_slo_seconds}s target"
+            )
+        else:
+            logger.info(
+                f"Critical time-to-ticket SLO met: p95 {stats['p95']:.2f}s "
+                f"<= {self.critical_slo_seconds}s target"
+            )
+
+    def _next_entry(self, critical_only):
+        """Block until there is an alert this worker may take, or the queue is finished."""
+        with self._condition:
+            while True:
+                if self._queue and (not critical_only or self._queue[0][0] == 0):
+                    self._in_flight += 1
+                    return heapq.heappop(self._queue)
+                if self._closed and (critical_only or not self._queue):
+                    return None
+                self._condition.wait()
+
+    def _work(self, critical_only):
+        while True:
+            entry = self._next_entry(critical_only)
+            if entry is None:
+                return
+            _, _, _, submitted_at, alert = entry
+
+            try:
+                created = self.handler(alert)
+            except Exception as e:
+                logger.error(f"Ticket handler failed for alert '{alert.get('title', 'Unknown')}': {e}")
+                created = False
+
+            elapsed = max(0.0, time.time() - submitted_at)
+            severity = str(alert.get('severity', 'unknown')).lower()
+            with self._stats_lock:
+                if created:
+                    self._succeeded += 1
+                    self._latencies.setdefault(severity, []).append(elapsed)
+                else:
+                    self._failed += 1
+
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
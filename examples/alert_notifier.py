@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Batched Slack and Email Alert Notifications
+-------------------------------------------
+Tell the right people about new security tickets without slowing triage down.
+
+AlertNotifier reads the notification_config block from config.json and runs
+in a background thread. The triage loop calls notify() right after a ticket
+is created; that call only drops the alert on an in-memory queue and returns
+immediately. The background thread groups alerts per destination (Slack
+channel or email severity group) over batch_window_seconds and sends one
+digest per destination, reusing a single SMTP connection for all the emails.
+A digest that fails (a Slack 429, an SMTP hiccup) is retried once on the
+next window before it is dropped.
+
+Trying it locally with stand-in servers:
+    python -m aiosmtpd -n -l localhost:1025      # prints every email it gets
+    # then in config.json: "smtp_server": "localhost", "smtp_port": 1025,
+    #                      "use_tls": false, and a local webhook_url
+"""
+
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve_secret(value):
+    """Resolve 'ENV:NAME' config values from the environment."""
+    if isinstance(value, str) and value.startswith('ENV:'):
+        return os.getenv(value[4:])
+    return value
+
+
+class AlertNotifier:
+    """
+    Non-blocking, batched Slack and email notification fan-out.
+
+    Alerts are routed by severity: Slack uses severity_channels (falling back
+    to the default channel) and email uses the recipients list for that
+    severity. Severities without email recipients are only sent to Slack.
+    """
+
+    def __init__(self, notification_config, batch_window_seconds=None,
+                 max_batch_size=50, max_queue_size=10000):
+        """
+        Args:
+            notification_config (dict): The notification_config block from config.json
+            batch_window_seconds (float): How long to collect alerts before sending a digest
+                (default: notification_config's batch_window_seconds, or 5)
+            max_batch_size (int): Send a digest early once this many alerts are waiting
+            max_queue_size (int): Alerts beyond this are dropped rather than blocking triage
+        """
+        self.slack_config = notification_config.get('slack', {})
+        self.email_config = notification_config.get('email', {})
+        if batch_window_seconds is None:
+            batch_window_seconds = notification_config.get('batch_window_seconds', 5)
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch_size = max_batch_size
+
+        self.webhook_url = _resolve_secret(self.slack_config.get('webhook_url'))
+        if self.slack_config and not self.webhook_url:
+            logger.warning("Slack webhook URL not set - Slack notifications disabled")
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._http = requests.Session()
+        self._smtp = None
+        self.sent = 0
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name="alert-notifier", daemon=True)
+        self._thread.start()
+
+    def notify(self, alert, ticket_key=None):
+        """Queue a notification for an alert. Never blocks the caller."""
+        try:
+            self._queue.put_nowait((alert, ticket_key))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Notification queue full - dropped notification for '{alert.get('title', 'Unknown')}'")
+
+    def close(self, timeout=30):
+        """Send whatever is still waiting, then shut the background thread down."""
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Notifier did not finish sending within the shutdown timeout")
+
+    def _run(self):
+        batches = {}
+        retries = {}
+        window_started = None
+
+        while True:
+            try:
+                alert, ticket_key = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                alert = None
+            else:
+                if window_started is None:
+                    window_started = time.monotonic()
+                for destination in self._destinations(alert):
+                    batches.setdefault(destination, []).append((alert, ticket_key))
+
+            drained = self._stop.is_set() and self._queue.empty()
+            window_elapsed = (
+                window_started is not None
+                and time.monotonic() - window_started >= self.batch_window_seconds
+            )
+            batch_full = any(len(items) >= self.max_batch_size for items in batches.values())
+
+            if (batches and (drained or window_elapsed or batch_full)) or (retries and window_elapsed):
+                retries = self._flush(batches, retries)
+                batches = {}
+                # Failed digests get one more try once the next window has passed
+                window_started = time.monotonic() if retries else None
+
+            if drained and not batches and not retries:
+                self._close_smtp()
+                return
+
+    def _destinations(self, alert):
+        """Where an alert's notification should go, as (kind, target) pairs."""
+        severity = str(alert.get('severity', 'unknown')).lower()
+        destinations = []
+
+        if self.webhook_url:
+            channel = self.slack_config.get('severity_channels', {}).get(
+                severity, self.slack_config.get('channel')
+            )
+            destinations.append(('slack', channel))
+
+        if self.email_config.get('recipients', {}).get(severity):
+            destinations.append(('email', severity))
+
+        return destinations
+
+    def _flush(self, batches, retries):
+        """
+        Send retried digests, then this window's digests.
+
+        Returns:
+            dict: This window's digests that failed, to retry next window
+        """
+        for (kind, target), items in retries.items():
+            try:
+                self._send_digest(kind, target, items)
+            except Exception as e:
+                logger.error(f"Dropping {kind} digest of {len(items)} alert(s) to {target} after retry: {e}")
+
+        failed = {}
+        for (kind, target), items in batches.items():
+            try:
+                self._send_digest(kind, target, items)
+            except Exception as e:
+                logger.warning(f"Failed to send {kind} digest to {target}: {e} - retrying next window")
+                failed[(kind, target)] = items
+        return failed
+
+    def _send_digest(self, kind, target, items):
+        if kind == 'slack':
+            self._send_slack_digest(target, items)
+        else:
+            self._send_email_digest(target, items)
+        self.sent += len(items)
+
+    def _digest_lines(self, items):
+        lines = []
+        for alert, ticket_key in items:
+            line = f"• [{str(alert.get('severity', 'unknown')).upper()}] {alert.get('title', 'Security Alert')}"
+            host = alert.get('affected_host') or alert.get('source_ip')
+            if host and host != 'N/A':
+                line += f" ({host})"
+            if ticket_key:
+                line += f" - {ticket_key}"
+            lines.append(line)
+        return lines
+
+    def _send_slack_digest(self, channel, items):
+        payload = {
+            'text': f"🚨 {len(items)} new security alert(s) ticketed\n" + "\n".join(self._digest_lines(items))
+        }
+        if channel:
+            payload['channel'] = channel
+
+        response = self._http.post(self.webhook_url, json=payload, timeout=10)
+        response.raise_for_status()
+        logger.info(f"Sent Slack digest of {len(items)} alert(s) to {channel or 'default channel'}")
+
+    def _send_email_digest(self, severity, items):
+        recipients = self.email_config['recipients'][severity]
+
+        message = EmailMessage()
+        message['Subject'] = f"[{severity.upper()}] {len(items)} new security alert(s) ticketed"
+        message['From'] = self.email_config.get('from_address', self.email_config.get('username'))
+        message['To'] = ", ".join(recipients)
+        message.set_content("\n".join(self._digest_lines(items)))
+
+        try:
+            self._smtp_connection().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connections get dropped by the server - reconnect once and retry
+            self._smtp = None
+            self._smtp_connection().send_message(message)
+        logger.info(f"Emailed digest of {len(items)} {severity} alert(s) to {len(recipients)} recipient(s)")
+
+    def _smtp_connection(self):
+        """Open the shared SMTP connection on first use and keep it for later digests."""
+        if self._smtp is None:
+            port = self.email_config.get('smtp_port', 587)
+            smtp = smtplib.SMTP(self.email_config.get('smtp_server', 'localhost'), port, timeout=30)
+            if self.email_config.get('use_tls', port == 587):
+                smtp.starttls()
+            username = self.email_config.get('username')
+            password = _resolve_secret(self.email_config.get('password'))
+            if username and password:
+                smtp.login(username, password)
+            self._smtp = smtp
+        return self._smtp
+
+    def _close_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
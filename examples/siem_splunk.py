@@ -12,17 +12,33 @@ Prerequisites:
 
 Usage:
     python siem_splunk.py --config config.json
+
+Scaling out (any number of workers, no duplicate tickets):
+    python siem_splunk.py --queue triage_queue.db --role fetch
+    python siem_splunk.py --queue triage_queue.db --role work   # start as many as you need
 """
 
 import requests
+import argparse
 import json
 import logging
+import os
+import socket
+import threading
+import time
 from datetime import datetime, timedelta
 
+from alert_dispatcher import SeverityDispatcher
+from alert_notifier import AlertNotifier
+from work_queue import SQLiteWorkQueue
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# A hung Jira call must not outlive the work queue lease it runs under
+JIRA_TIMEOUT_SECONDS = 30
+
 class SplunkSIEMTriage:
     def __init__(self, splunk_host, splunk_port, username, password, jira_url, jira_auth):
         self.splunk_base_url = f"https://{splunk_host}:{splunk_port}"
@@ -77,8 +93,41 @@ class SplunkSIEMTriage:
         
         return any(high_risk_conditions)
     
-    def create_jira_ticket(self, alert):
-        """Create a Jira ticket for actionable alerts"""
+    def find_ticket_by_fingerprint(self, fingerprint):
+        """Return the key of a ticket already created for this alert fingerprint, or None"""
+        response = requests.get(
+            f"{self.jira_url}/rest/api/2/search",
+            params={
+                'jql': f'project = SEC AND labels = "alert-{fingerprint}"',
+                'fields': 'key',
+                'maxResults': 1
+            },
+            auth=self.jira_auth,
+            timeout=JIRA_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        issues = response.json().get('issues', [])
+        return issues[0]['key'] if issues else None
+    
+    def create_jira_ticket(self, alert, fingerprint=None):
+        """
+        Create a Jira ticket for actionable alerts
+        
+        With a work queue fingerprint the ticket is labelled alert-<fingerprint>,
+        and an existing ticket with that label is returned instead of creating a
+        second one when an alert is retried after a worker crash. Jira's search
+        index can lag a few seconds, which is well inside the queue lease.
+        """
+        
+        if fingerprint:
+            try:
+                existing_key = self.find_ticket_by_fingerprint(fingerprint)
+            except requests.RequestException as e:
+                logger.error(f"Error checking Jira for an existing ticket: {e}")
+                return None
+            if existing_key:
+                logger.info(f"Jira ticket {existing_key} already exists for alert: {alert.get('title')}")
+                return existing_key
         
         # Extract key information
         alert_time = alert.get('_time', datetime.now().isoformat())
@@ -116,13 +165,16 @@ _Auto-generated from Splunk SIEM alert triage system_
                 "labels": ["security", "siem", f"severity-{severity}"]
             }
         }
+        if fingerprint:
+            ticket_payload["fields"]["labels"].append(f"alert-{fingerprint}")
         
         try:
             response = requests.post(
                 f"{self.jira_url}/rest/api/2/issue",
                 json=ticket_payload,
                 auth=self.jira_auth,
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=JIRA_TIMEOUT_SECONDS
             )
             response.raise_for_status()
             
@@ -134,9 +186,127 @@ _Auto-generated from Splunk SIEM alert triage system_
             logger.error(f"Error creating Jira ticket: {e}")
             return None
 
+def build_dispatcher(config, handler):
+    """Severity-priority dispatcher configured from the 'dispatch' settings"""
+    return SeverityDispatcher(
+        handler,
+        priority_mapping=config["jira"]["priority_mapping"],
+        workers=config["dispatch"]["workers"],
+        reserved_critical_workers=config["dispatch"]["reserved_critical_workers"],
+        critical_slo_seconds=config["dispatch"]["critical_slo_seconds"]
+    )
+
+def run_queue_worker(triage, config, work_queue, worker_id, notifier, drain=False):
+    """
+    Process alerts from the shared work queue until stopped.
+    
+    One long-lived dispatcher is topped up from this worker's partitions as
+    tickets finish, so a critical alert queued later still jumps ahead of
+    everything waiting here. A heartbeat thread keeps the worker, partition
+    and in-flight alert leases alive however long a ticket takes, and each
+    alert is acked once handled, so any number of workers can run side by
+    side without duplicate tickets. With drain=True the worker exits once
+    the whole queue has nothing pending or leased, so alerts backing off
+    after a failure are still retried before it stops.
+    """
+    logger.info(f"Worker {worker_id} joining the triage work queue")
+    queue_config = config["queue"]
+    actionable_count = 0
+    
+    held = {}  # id(alert) -> fingerprint for alerts handed to the dispatcher
+    held_lock = threading.Lock()
+    stop_heartbeat = threading.Event()
+    
+    def keep_leases():
+        while not stop_heartbeat.wait(queue_config["lease_seconds"] / 3):
+            try:
+                work_queue.acquire_partitions(worker_id)
+                with held_lock:
+                    fingerprints = list(held.values())
+                if fingerprints:
+                    lost = set(fingerprints) - set(work_queue.renew(worker_id, fingerprints))
+                    for fingerprint in lost:
+                        logger.warning(f"Lost lease on {fingerprint[:12]} - another worker now owns it")
+            except Exception as e:
+                logger.error(f"Failed to renew work queue leases: {e}")
+    
+    def ticket_and_ack(alert):
+        with held_lock:
+            fingerprint = held[id(alert)]
+        try:
+            # Never ticket an alert whose lease has moved to another worker
+            if not work_queue.renew(worker_id, [fingerprint]):
+                logger.warning(f"Skipping {fingerprint[:12]} - lease already lost")
+                return None
+            ticket_key = triage.create_jira_ticket(alert, fingerprint=fingerprint)
+            if ticket_key:
+                notifier.notify(alert, ticket_key)
+                work_queue.ack(worker_id, fingerprint)
+            else:
+                work_queue.nack(worker_id, fingerprint)
+            return ticket_key
+        finally:
+            with held_lock:
+                del held[id(alert)]
+    
+    work_queue.acquire_partitions(worker_id)
+    heartbeat = threading.Thread(target=keep_leases, name="queue-heartbeat", daemon=True)
+    heartbeat.start()
+    dispatcher = build_dispatcher(config, ticket_and_ack)
+    report = None
+    
+    try:
+        while True:
+            if not dispatcher.wait_for_capacity(queue_config["batch_size"], timeout=queue_config["poll_seconds"]):
+                continue
+            
+            room = queue_config["batch_size"] - dispatcher.outstanding()
+            batch = work_queue.claim(worker_id, limit=room)
+            
+            for fingerprint, alert, enqueued_at in batch:
+                if triage.is_actionable(alert):
+                    actionable_count += 1
+                    with held_lock:
+                        held[id(alert)] = fingerprint
+                    # Time-to-ticket starts when the alert entered the queue
+                    dispatcher.submit(alert, submitted_at=enqueued_at)
+                else:
+                    work_queue.ack(worker_id, fingerprint)
+            
+            if not batch:
+                if drain and dispatcher.outstanding() == 0 and not work_queue.has_open_work():
+                    break
+                # Nothing here right now - pick up partitions freed by workers that left or rebalanced
+                work_queue.acquire_partitions(worker_id)
+                time.sleep(queue_config["poll_seconds"])
+        
+        report = dispatcher.close()
+    finally:
+        if report is None:
+            # Interrupted: let tickets already in flight finish before giving anything back
+            report = dispatcher.close(cancel_pending=True)
+        stop_heartbeat.set()
+        heartbeat.join()
+        # Nothing is in flight now, so unstarted alerts can safely go back to pending
+        work_queue.release(worker_id)
+    
+    dispatcher.log_report(report)
+    logger.info(f"Worker {worker_id} done: {actionable_count} actionable alerts, {report['succeeded']} tickets created")
+
 def main():
     """Main execution function"""
     
+    parser = argparse.ArgumentParser(description="Splunk SIEM alert triage")
+    parser.add_argument('--queue', help='SQLite work queue file shared by all triage workers')
+    parser.add_argument('--role', choices=['fetch', 'work', 'all'], default='all',
+                        help='With --queue: fetch alerts into the queue, work the queue, or both (default: all)')
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}",
+                        help='Unique name for this worker (default: hostname-pid)')
+    parser.add_argument('--drain', action='store_true',
+                        help='Workers exit once the queue has nothing left for them')
+    # Options this example does not use yet (--config, --hours, ...) are ignored
+    args, _ = parser.parse_known_args()
+    
     # Configuration (in production, load from secure config file)
     config = {
         "splunk": {
@@ -147,7 +317,38 @@ def main():
         },
         "jira": {
             "url": "https://your-company.atlassian.net",
-            "auth": ("jira_username", "jira_api_token")  # Use environment variables
+            "auth": ("jira_username", "jira_api_token"),  # Use environment variables
+            "priority_mapping": {
+                "critical": "Highest",
+                "high": "High",
+                "medium": "Medium",
+                "low": "Low"
+            }
+        },
+        "dispatch": {
+            "workers": 4,
+            "reserved_critical_workers": 1,  # Only ever used for critical alerts
+            "critical_slo_seconds": 60
+        },
+        "queue": {
+            "partitions": 64,
+            "lease_seconds": 120,  # Renewed every lease_seconds / 3 while an alert is in flight
+            "batch_size": 20,  # Alerts held by this worker at once, queued or in flight
+            "poll_seconds": 2
+        },
+        "notification_config": {
+            "slack": {
+                "webhook_url": "ENV:SLACK_WEBHOOK_URL",
+                "channel": "#security-alerts",
+                "severity_channels": {"critical": "#security-critical"}
+            },
+            "email": {
+                "smtp_server": "smtp.company.com",
+                "smtp_port": 587,
+                "username": "alerts@company.com",
+                "password": "ENV:EMAIL_PASSWORD",
+                "recipients": {"critical": ["security-team@company.com"]}
+            }
         }
     }
     
@@ -163,21 +364,58 @@ def main():
     
     logger.info("Starting SIEM alert triage process...")
     
+    if args.queue:
+        work_queue = SQLiteWorkQueue(
+            args.queue,
+            partitions=config["queue"]["partitions"],
+            lease_seconds=config["queue"]["lease_seconds"],
+            severity_order=list(config["jira"]["priority_mapping"])
+        )
+        
+        if args.role in ("fetch", "all"):
+            alerts = triage.get_splunk_alerts()
+            added = work_queue.enqueue(alerts)
+            logger.info(f"Queued {added} new or re-opened alerts ({len(alerts) - added} already known)")
+        
+        if args.role in ("work", "all"):
+            notifier = AlertNotifier(config["notification_config"])
+            run_queue_worker(triage, config, work_queue, args.worker_id, notifier,
+                             drain=args.drain or args.role == "all")
+            notifier.close()
+        
+        logger.info(f"Queue status: {work_queue.stats()}")
+        work_queue.close()
+        return
+    
     # Fetch and process alerts
     alerts = triage.get_splunk_alerts()
     logger.info(f"Found {len(alerts)} alerts to process")
     
+    # New tickets are announced on Slack/email in the background, batched into digests
+    notifier = AlertNotifier(config["notification_config"])
+    
+    def ticket_and_notify(alert):
+        ticket_key = triage.create_jira_ticket(alert)
+        if ticket_key:
+            notifier.notify(alert, ticket_key)
+        return ticket_key
+    
+    # Critical alerts are ticketed first, whatever order Splunk returned them in
+    dispatcher = build_dispatcher(config, ticket_and_notify)
+    
     actionable_count = 0
-    tickets_created = 0
     
     for alert in alerts:
         if triage.is_actionable(alert):
             actionable_count += 1
-            ticket_key = triage.create_jira_ticket(alert)
-            if ticket_key:
-                tickets_created += 1
+            dispatcher.submit(alert)
+    
+    report = dispatcher.close()
+    tickets_created = report['succeeded']
+    notifier.close()
     
     logger.info(f"Processing complete: {actionable_count} actionable alerts, {tickets_created} tickets created")
+    dispatcher.log_report(report)
 
 if __name__ == "__main__":
     main()
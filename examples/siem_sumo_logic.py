@@ -25,10 +25,16 @@ import json
 import logging
 from datetime import datetime, timedelta
 from sumoapi import SumoAPIClient
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import argparse
+import heapq
+import math
 import sys
 import os
 
+from alert_dispatcher import SeverityDispatcher
+from alert_notifier import AlertNotifier
+
 # Set up friendly logging that actually helps you debug
 logging.basicConfig(
     level=logging.INFO, 
@@ -40,6 +46,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _to_epoch_ms(value):
+    """Convert a naive UTC datetime to Sumo Logic epoch milliseconds."""
+    return int((value - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def _record_time(record):
+    """Sort key for Sumo Logic records: message time in epoch milliseconds."""
+    try:
+        return int(record.get('_messagetime', 0))
+    except (TypeError, ValueError):
+        return 0
+
+
 class SumoLogicSIEMTriage:
     """
     Your Sumo Logic alert triage companion! 
@@ -90,7 +110,7 @@ class SumoLogicSIEMTriage:
             return env_value
         return value
     
-    def get_sumo_alerts(self, time_range_hours=24):
+    def get_sumo_alerts(self, time_range_hours=24, sliced=False):
         """
         Fetch security alerts from Sumo Logic that need your attention.
         
@@ -100,6 +120,8 @@ class SumoLogicSIEMTriage:
         
         Args:
             time_range_hours (int): How far back to look (default: 24 hours)
+            sliced (bool): Split the window into parallel sub-searches so every
+                alert is fetched instead of stopping at max_results
             
         Returns:
             list: Your prioritized list of security alerts
@@ -109,13 +131,52 @@ class SumoLogicSIEMTriage:
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(hours=time_range_hours)
         
+        if sliced:
+            return self._get_sliced_sumo_alerts(start_time, end_time)
+        
+        max_results = self.sumo_config.get('max_results', 100)
+        
+        try:
+            logger.info(f"🔍 Searching Sumo Logic for alerts from the last {time_range_hours} hours...")
+            
+            # Wait for results (Sumo Logic processes this in the background)
+            logger.info("⏳ Waiting for Sumo Logic to process your search... (this usually takes 30-60 seconds)")
+            results = self._run_search(
+                self._build_alert_query(start_time, end_time, limit=max_results),
+                start_time,
+                end_time
+            )
+            
+            logger.info(f"✅ Found {len(results)} potential security alerts to review!")
+            
+            if len(results) >= max_results:
+                logger.warning(f"⚠️  Hit the {max_results} result limit - older alerts in this window were not fetched!")
+                logger.info("💡 Tip: Re-run with --sliced to fetch every alert in the window")
+            
+            return [self._format_alert(record) for record in results]
+            
+        except Exception as e:
+            logger.error(f"❌ Oops! Had trouble connecting to Sumo Logic: {str(e)}")
+            logger.info("💡 Tip: Check your credentials and network connection. You've got this!")
+            return []
+    
+    def _build_alert_query(self, start_time, end_time, limit=None, inclusive_end=True):
+        """
+        Build our smart alert query for a single time window.
+        
+        Sliced searches use an exclusive end so neighbouring slices never
+        return the same alert twice.
+        """
+        end_operator = '<=' if inclusive_end else '<'
+        limit_clause = f"| limit {limit}" if limit else ''
+        
         # Here's our smart query - it finds the alerts that actually matter
-        search_query = f'''
-        _sourceCategory=security/alerts
+        return f'''
+        _sourceCategory={self.sumo_config.get('source_category', 'security/alerts')}
         | where severity in ("HIGH", "CRITICAL", "high", "critical")
         | where status != "RESOLVED" and status != "resolved"
-        | where _messageTime >= {int(start_time.timestamp() * 1000)}
-        | where _messageTime <= {int(end_time.timestamp() * 1000)}
+        | where _messageTime >= {_to_epoch_ms(start_time)}
+        | where _messageTime {end_operator} {_to_epoch_ms(end_time)}
         | json field=_raw "alert_id" as alert_id
         | json field=_raw "title" as title
         | json field=_raw "description" as description  
@@ -126,52 +187,241 @@ class SumoLogicSIEMTriage:
         | json field=_raw "host" as affected_host
         | json field=_raw "detection_rule" as detection_rule
         | sort by _messageTime desc
-        | limit 100
+        {limit_clause}
         '''
+    
+    def _run_search(self, query, start_time, end_time):
+        """
+        Run one Sumo Logic search job and hand back its records.
+        """
+        search_job = self.sumo_client.search_job(
+            query=query,
+            from_time=start_time.isoformat() + 'Z',
+            to_time=end_time.isoformat() + 'Z'
+        )
+        search_job.wait_for_completion()
+        return search_job.records()
+    
+    def _format_alert(self, record):
+        """
+        Convert a Sumo Logic record to our standard format for easier processing.
+        """
+        return {
+            'id': record.get('alert_id', f"sumo_{record.get('_messageid', 'unknown')}"),
+            'timestamp': record.get('_messagetime', ''),
+            'title': record.get('title', 'Security Alert'),
+            'description': record.get('description', 'No description available'),
+            'severity': record.get('severity', 'medium').upper(),
+            'source_ip': record.get('source_ip', 'N/A'),
+            'destination_ip': record.get('destination_ip', 'N/A'),
+            'affected_user': record.get('affected_user', 'N/A'),
+            'affected_host': record.get('affected_host', 'N/A'),
+            'detection_rule': record.get('detection_rule', 'N/A'),
+            'raw_data': record
+        }
+    
+    def _get_sliced_sumo_alerts(self, start_time, end_time):
+        """
+        Fetch every alert in the window using parallel time-sliced searches.
         
-        try:
-            logger.info(f"🔍 Searching Sumo Logic for alerts from the last {time_range_hours} hours...")
+        A quick density probe tells us where the alerts are, the window is cut
+        into sub-windows holding roughly the same number of alerts, and each
+        sub-window runs as its own search job. Every slice comes back sorted
+        newest-first, so a k-way merge gives one ordered list at the end.
+        """
+        slice_config = self.sumo_config.get('sliced_search', {})
+        max_parallel = max(1, slice_config.get('max_parallel_searches', 4))
+        
+        logger.info(f"🔍 Planning sliced Sumo Logic search from {start_time.isoformat()}Z to {end_time.isoformat()}Z...")
+        windows = self._plan_search_slices(start_time, end_time, max_parallel)
+        
+        if not windows:
+            logger.info("✅ Density probe found no alerts in this window")
+            return []
+        
+        logger.info(f"⚡ Running {len(windows)} slices with up to {max_parallel} parallel search jobs...")
+        
+        slice_results = [None] * len(windows)
+        failed_slices = 0
+        
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            futures = {
+                executor.submit(
+                    self._run_slice,
+                    slice_start,
+                    slice_end,
+                    index == len(windows) - 1
+                ): index
+                for index, (slice_start, slice_end) in enumerate(windows)
+            }
             
-            # Execute the search job
-            search_job = self.sumo_client.search_job(
-                query=search_query,
-                from_time=start_time.isoformat() + 'Z',
-                to_time=end_time.isoformat() + 'Z'
+            for future in as_completed(futures):
+                index = futures[future]
+                slice_start, slice_end = windows[index]
+                try:
+                    records = future.result()
+                except Exception as e:
+                    failed_slices += 1
+                    slice_results[index] = []
+                    logger.error(f"❌ Slice {slice_start.isoformat()}Z - {slice_end.isoformat()}Z failed: {str(e)}")
+                    continue
+                
+                # Results should already be newest-first, but the merge depends on it
+                slice_results[index] = sorted(records, key=_record_time, reverse=True)
+                logger.info(f"✅ Slice {index + 1}/{len(windows)} returned {len(records)} alerts")
+        
+        merged = heapq.merge(*slice_results, key=_record_time, reverse=True)
+        formatted_alerts = [self._format_alert(record) for record in merged]
+        
+        logger.info(f"✅ Found {len(formatted_alerts)} potential security alerts to review!")
+        if failed_slices:
+            logger.warning(f"⚠️  {failed_slices} of {len(windows)} slices failed - some alerts in this window are missing!")
+        
+        return formatted_alerts
+    
+    def _run_slice(self, slice_start, slice_end, inclusive_end):
+        """
+        Run one slice's search, retrying once as two half-width searches.
+        
+        Smaller searches are more likely to get through a transient Sumo Logic
+        error or timeout, and every alert in the slice still gets fetched.
+        """
+        try:
+            return self._run_search(
+                self._build_alert_query(slice_start, slice_end, inclusive_end=inclusive_end),
+                slice_start,
+                slice_end
             )
+        except Exception as e:
+            logger.warning(f"⚠️  Slice {slice_start.isoformat()}Z - {slice_end.isoformat()}Z failed ({str(e)}) - retrying as two halves")
+        
+        middle = slice_start + (slice_end - slice_start) / 2
+        return (
+            self._run_search(self._build_alert_query(slice_start, middle, inclusive_end=False), slice_start, middle)
+            + self._run_search(self._build_alert_query(middle, slice_end, inclusive_end=inclusive_end), middle, slice_end)
+        )
+    
+    def _plan_search_slices(self, start_time, end_time, max_parallel):
+        """
+        Split the search window into sub-windows sized from event density.
+        
+        Busy periods get narrow slices and quiet periods get wide ones, so each
+        search job does about the same amount of work. A spike inside a single
+        probe bucket is re-probed at a finer timeslice so it can be split too.
+        If the density probe fails we fall back to evenly sized slices.
+        
+        Returns:
+            list: (start, end) datetime pairs in chronological order
+        """
+        slice_config = self.sumo_config.get('sliced_search', {})
+        target_events = max(1, slice_config.get('target_events_per_slice', 5000))
+        probe_buckets = max(1, slice_config.get('probe_buckets', 60))
+        
+        window_seconds = (end_time - start_time).total_seconds()
+        bucket_seconds = max(1, int(math.ceil(window_seconds / probe_buckets)))
+        
+        try:
+            density = self._probe_event_density(start_time, end_time, bucket_seconds)
+        except Exception as e:
+            logger.warning(f"⚠️  Density probe failed ({str(e)}) - falling back to {max_parallel} even slices")
+            step = (end_time - start_time) / max_parallel
+            return [
+                (start_time + step * i, end_time if i == max_parallel - 1 else start_time + step * (i + 1))
+                for i in range(max_parallel)
+            ]
+        
+        total_events = sum(count for _, _, count in density)
+        if total_events == 0:
+            return []
+        
+        # Never fewer slices than parallel searches, so extra workers always help
+        per_slice = min(target_events, int(math.ceil(total_events / max_parallel)))
+        logger.info(f"📊 Density probe counted {total_events} alerts - aiming for ~{per_slice} per slice")
+        
+        density = self._refine_density(density, per_slice, probe_buckets)
+        
+        windows = []
+        slice_start = start_time
+        running = 0
+        for bucket_start, _, count in density:
+            if running and running + count > per_slice and bucket_start > slice_start:
+                windows.append((slice_start, bucket_start))
+                slice_start = bucket_start
+                running = 0
+            running += count
+        windows.append((slice_start, end_time))
+        
+        return windows
+    
+    def _refine_density(self, density, per_slice, probe_buckets):
+        """
+        Break up any probe bucket holding more than per_slice alerts.
+        
+        Oversized buckets are re-probed at a finer timeslice until every bucket
+        fits. Once a bucket can't be probed any finer (one second, or the probe
+        fails) it is split evenly in time instead.
+        
+        Returns:
+            list: (bucket start, bucket end, alert count) tuples, oldest first
+        """
+        refined = []
+        for bucket_start, bucket_end, count in density:
+            if count <= per_slice:
+                refined.append((bucket_start, bucket_end, count))
+                continue
             
-            # Wait for results (Sumo Logic processes this in the background)
-            logger.info("⏳ Waiting for Sumo Logic to process your search... (this usually takes 30-60 seconds)")
-            search_job.wait_for_completion()
-            
-            # Get the results
-            results = search_job.records()
-            
-            logger.info(f"✅ Found {len(results)} potential security alerts to review!")
-            
-            # Convert to our standard format for easier processing
-            formatted_alerts = []
-            for record in results:
-                alert = {
-                    'id': record.get('alert_id', f"sumo_{record.get('_messageid', 'unknown')}"),
-                    'timestamp': record.get('_messagetime', ''),
-                    'title': record.get('title', 'Security Alert'),
-                    'description': record.get('description', 'No description available'),
-                    'severity': record.get('severity', 'medium').upper(),
-                    'source_ip': record.get('source_ip', 'N/A'),
-                    'destination_ip': record.get('destination_ip', 'N/A'),
-                    'affected_user': record.get('affected_user', 'N/A'),
-                    'affected_host': record.get('affected_host', 'N/A'),
-                    'detection_rule': record.get('detection_rule', 'N/A'),
-                    'raw_data': record
-                }
-                formatted_alerts.append(alert)
+            width = (bucket_end - bucket_start).total_seconds()
+            finer = None
+            if width > 1:
+                try:
+                    finer = self._probe_event_density(
+                        bucket_start, bucket_end, max(1, int(width // probe_buckets))
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️  Re-probe of busy bucket at {bucket_start.isoformat()}Z failed ({str(e)})")
             
-            return formatted_alerts
+            if finer:
+                refined.extend(self._refine_density(finer, per_slice, probe_buckets))
+                continue
             
-        except Exception as e:
-            logger.error(f"❌ Oops! Had trouble connecting to Sumo Logic: {str(e)}")
-            logger.info("💡 Tip: Check your credentials and network connection. You've got this!")
-            return []
+            # Can't see inside this bucket any more - assume the alerts are spread evenly
+            pieces = max(1, min(int(math.ceil(count / per_slice)), int(width * 1000)))
+            step = (bucket_end - bucket_start) / pieces
+            for i in range(pieces):
+                refined.append((
+                    bucket_start + step * i,
+                    bucket_end if i == pieces - 1 else bucket_start + step * (i + 1),
+                    count // pieces + (1 if i < count % pieces else 0)
+                ))
+        
+        return refined
+    
+    def _probe_event_density(self, start_time, end_time, bucket_seconds):
+        """
+        Count matching alerts per timeslice bucket across the window.
+        
+        Returns:
+            list: (bucket start, bucket end, alert count) tuples, oldest first
+        """
+        probe_query = f'''
+        _sourceCategory={self.sumo_config.get('source_category', 'security/alerts')}
+        | where severity in ("HIGH", "CRITICAL", "high", "critical")
+        | where status != "RESOLVED" and status != "resolved"
+        | where _messageTime >= {_to_epoch_ms(start_time)}
+        | where _messageTime <= {_to_epoch_ms(end_time)}
+        | timeslice {bucket_seconds}s
+        | count by _timeslice
+        | sort by _timeslice asc
+        '''
+        
+        density = []
+        for record in self._run_search(probe_query, start_time, end_time):
+            # Sumo Logic aligns timeslices to the epoch, so clamp them to the window
+            bucket_start = datetime.utcfromtimestamp(int(record.get('_timeslice', 0)) / 1000)
+            bucket_end = min(bucket_start + timedelta(seconds=bucket_seconds), end_time)
+            density.append((max(bucket_start, start_time), bucket_end, int(record.get('_count', 0))))
+        
+        return sorted(density)
     
     def is_actionable(self, alert):
         """
@@ -254,7 +504,7 @@ class SumoLogicSIEMTriage:
             alert (dict): The security alert to convert
             
         Returns:
-            bool: True if ticket was created successfully
+            str: The new ticket key, or None if the ticket could not be created
         """
         
         # Build a comprehensive, helpful ticket description
@@ -305,15 +555,15 @@ class SumoLogicSIEMTriage:
                 
                 logger.info(f"✅ Created Jira ticket {ticket_key} for alert: {alert.get('title', 'Unknown')}")
                 logger.info(f"🔗 View ticket: {ticket_url}")
-                return True
+                return ticket_key
             else:
                 logger.error(f"❌ Failed to create Jira ticket. Response: {response.status_code} - {response.text}")
-                return False
+                return None
                 
         except Exception as e:
             logger.error(f"❌ Error creating Jira ticket: {str(e)}")
             logger.info("💡 Tip: Double-check your Jira URL and authentication credentials")
-            return False
+            return None
     
     def _build_ticket_description(self, alert):
         """
@@ -408,6 +658,11 @@ def main():
         action='store_true',
         help='Test mode: show what would be processed without creating tickets'
     )
+    parser.add_argument(
+        '--sliced',
+        action='store_true',
+        help='Fetch every alert using parallel time-sliced searches (no max_results ceiling)'
+    )
     
     args = parser.parse_args()
     
@@ -428,15 +683,41 @@ def main():
         logger.info("🧪 Test mode enabled - no tickets will be created")
     
     # Fetch alerts from Sumo Logic
-    alerts = triage.get_sumo_alerts(time_range_hours=args.hours)
+    alerts = triage.get_sumo_alerts(time_range_hours=args.hours, sliced=args.sliced)
     
     if not alerts:
         logger.info("🎉 No alerts found! Your security posture is looking good.")
         return
     
-    # Process each alert
+    # Process each alert - actionable ones go to the severity-priority dispatcher,
+    # so critical alerts are ticketed first no matter where the SIEM listed them
     actionable_count = 0
-    tickets_created = 0
+    
+    # New tickets are announced on Slack/email in the background, batched into digests
+    notifier = None
+    if config.get('notification_config') and not args.test:
+        notifier = AlertNotifier(config['notification_config'])
+    
+    def dispatch_ticket(alert):
+        if args.test:
+            logger.info(f"🧪 [TEST MODE] Would create Jira ticket for: {alert.get('title', 'Unknown Alert')}")
+            return True
+        ticket_key = triage.create_jira_ticket(alert)
+        if ticket_key:
+            if notifier:
+                notifier.notify(alert, ticket_key)
+            return True
+        logger.warning("⚠️  Failed to create ticket - continuing with other alerts")
+        return False
+    
+    dispatch_config = config.get('triage_dispatch', {})
+    dispatcher = SeverityDispatcher(
+        dispatch_ticket,
+        priority_mapping=config.get('jira_config', {}).get('priority_mapping'),
+        workers=dispatch_config.get('workers', 4),
+        reserved_critical_workers=dispatch_config.get('reserved_critical_workers', 1),
+        critical_slo_seconds=dispatch_config.get('critical_slo_seconds')
+    )
     
     logger.info(f"📊 Processing {len(alerts)} alerts...")
     
@@ -445,17 +726,17 @@ def main():
         
         if triage.is_actionable(alert):
             actionable_count += 1
-            
-            if args.test:
-                logger.info("🧪 [TEST MODE] Would create Jira ticket for this alert")
-            else:
-                if triage.create_jira_ticket(alert):
-                    tickets_created += 1
-                else:
-                    logger.warning("⚠️  Failed to create ticket - continuing with other alerts")
+            dispatcher.submit(alert)
         else:
             logger.info("ℹ️  Alert doesn't meet actionability criteria - skipping")
     
+    dispatch_report = dispatcher.close()
+    # Test mode still shows the dispatch order, but nothing was really ticketed
+    tickets_created = 0 if args.test else dispatch_report['succeeded']
+    
+    if notifier:
+        notifier.close()
+    
     # Summary report
     logger.info("=" * 60)
     logger.info("📈 TRIAGE SUMMARY")
@@ -472,6 +753,9 @@ def main():
         if tickets_created < actionable_count:
             logger.warning(f"⚠️  {actionable_count - tickets_created} tickets failed to create")
     
+    if not args.test:
+        dispatcher.log_report(dispatch_report)
+    
     # Helpful next steps
     logger.info("")
     logger.info("🎯 NEXT STEPS:")
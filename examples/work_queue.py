@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Shared Alert Work Queue
+-----------------------
+Lets any number of triage workers share the load without duplicate tickets.
+
+A fetcher puts alerts into the queue, keyed by a fingerprint of the alert, so
+the same alert fetched twice (by overlapping searches or two fetchers) is only
+stored once. The fingerprint hash also picks one of a fixed number of
+partitions. Each worker leases a fair share of the partitions and then leases
+the alerts inside them, so workers never compete for the same alert and adding
+workers adds throughput.
+
+Leases expire: if a worker dies, its partitions and alerts are picked up by
+the others after lease_seconds. Live workers renew their leases for as long as
+an alert is in flight, so a slow ticket never gets handed to a second worker.
+An alert is acked once it has been handled and is never handed out again.
+A failed alert is retried with exponential backoff, so a short Jira outage
+or rate limit only delays it. Attempts are only charged for real failures:
+a nack, or a lease that expired because its worker died. After max_attempts
+the alert is parked as 'failed' until the fetcher sees it again, which
+re-opens it. A worker that dies after creating a ticket but before acking
+it leaves the alert to be retried, so the ticket step should check for an
+existing ticket first (see SplunkSIEMTriage.create_jira_ticket).
+
+SQLiteWorkQueue works for workers on one host (or a local disk they share).
+For workers spread over several hosts, implement WorkQueue on a shared store
+such as PostgreSQL or Redis - the triage code only uses the WorkQueue methods.
+
+Usage:
+    queue = SQLiteWorkQueue('triage_queue.db')
+    queue.enqueue(alerts)                          # fetcher
+    queue.acquire_partitions('worker-1')           # worker, and every lease_seconds / 3
+    for fingerprint, alert, enqueued_at in queue.claim('worker-1', limit=50):
+        ...
+        queue.ack('worker-1', fingerprint)
+"""
+
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+DEFAULT_SEVERITY_ORDER = ['critical', 'high', 'medium', 'low']
+
+FINGERPRINT_FIELDS = [
+    'id', 'alert_id', '_time', 'timestamp', 'title', 'severity',
+    'source_ip', 'dest_ip', 'destination_ip', 'affected_user', 'affected_host'
+]
+
+
+def alert_fingerprint(alert):
+    """
+    Stable SHA-256 fingerprint of an alert's identifying fields.
+
+    Volatile fields like status or raw search metadata are left out, so the
+    same alert returned by two different searches gets the same fingerprint.
+    """
+    identity = {field: str(alert[field]) for field in FINGERPRINT_FIELDS if alert.get(field) not in (None, '')}
+    if not identity:
+        identity = {key: str(value) for key, value in alert.items()}
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class WorkQueue(ABC):
+    """
+    Interface for a shared, lease-based alert work queue.
+
+    Implement these methods on any store that supports atomic updates to run
+    triage workers against it.
+    """
+
+    @abstractmethod
+    def enqueue(self, alerts):
+        """
+        Add alerts; returns how many were new or re-opened.
+
+        Already-known fingerprints are skipped, except alerts parked as
+        'failed', which go back to pending with a fresh set of attempts.
+        """
+
+    @abstractmethod
+    def acquire_partitions(self, worker_id):
+        """Heartbeat, renew this worker's partition leases and rebalance to a fair share."""
+
+    @abstractmethod
+    def claim(self, worker_id, limit=50):
+        """
+        Lease up to limit pending alerts from this worker's partitions, most urgent first.
+        Alerts still backing off from a failure are skipped until their retry time.
+
+        Returns:
+            list: (fingerprint, alert, enqueued_at epoch seconds) tuples
+        """
+
+    @abstractmethod
+    def renew(self, worker_id, fingerprints):
+        """Extend this worker's leases on in-flight alerts; returns the fingerprints still held."""
+
+    @abstractmethod
+    def ack(self, worker_id, fingerprint):
+        """Mark a leased alert as done; returns False if the lease was lost."""
+
+    @abstractmethod
+    def nack(self, worker_id, fingerprint):
+        """Give a failed alert back for a retry after a backoff (or park it as failed after max_attempts)."""
+
+    @abstractmethod
+    def has_open_work(self):
+        """True while any alert in the queue is pending or leased, in any partition."""
+
+    @abstractmethod
+    def release(self, worker_id):
+        """Give up every partition and alert lease held by this worker. Only call with nothing in flight."""
+
+    @abstractmethod
+    def stats(self):
+        """Alert counts by state."""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    WorkQueue backed by a single SQLite file.
+
+    Every state change runs in a BEGIN IMMEDIATE transaction, so concurrent
+    worker processes are serialized by SQLite's write lock. WAL mode keeps
+    readers from blocking writers. Within one process the connection is
+    shared by all threads behind a lock, so dispatcher workers can ack.
+    """
+
+    def __init__(self, path, partitions=64, lease_seconds=120, max_attempts=5,
+                 backoff_seconds=30, max_backoff_seconds=900, severity_order=None):
+        """
+        Args:
+            path (str): SQLite database file shared by all workers
+            partitions (int): Number of fingerprint partitions (fixed for the life of the file)
+            lease_seconds (float): How long a partition or alert lease lasts without renewal
+            max_attempts (int): Failed attempts before an alert is parked as 'failed'
+            backoff_seconds (float): Retry delay after the first failure, doubling each time
+            max_backoff_seconds (float): Longest retry delay
+            severity_order (list): Severities most urgent first (default: critical, high, medium, low)
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.severity_order = [severity.lower() for severity in (severity_order or DEFAULT_SEVERITY_ORDER)]
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS alerts (
+                fingerprint TEXT PRIMARY KEY,
+                partition INTEGER NOT NULL,
+                priority INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                retry_at REAL NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                done_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS partitions (
+                partition INTEGER PRIMARY KEY,
+                owner TEXT,
+                lease_expires REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                heartbeat_expires REAL NOT NULL
+            );
+        """)
+        # Queue files created before retry backoff existed lack the retry_at column
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(alerts)")]
+        if 'retry_at' not in columns:
+            self._db.execute("ALTER TABLE alerts ADD COLUMN retry_at REAL NOT NULL DEFAULT 0")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS alerts_claim ON alerts (partition, state, priority, enqueued_at)"
+        )
+
+        with self._transaction():
+            self._db.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('partitions', ?)", (str(partitions),)
+            )
+            # The partition count is fixed once the file exists, or fingerprints would move
+            self.partitions = int(self._db.execute(
+                "SELECT value FROM meta WHERE key = 'partitions'"
+            ).fetchone()[0])
+            self._db.executemany(
+                "INSERT OR IGNORE INTO partitions (partition) VALUES (?)",
+                [(partition,) for partition in range(self.partitions)]
+            )
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._db, self._lock)
+
+    def _priority(self, alert):
+        severity = str(alert.get('severity', '')).lower()
+        if severity in self.severity_order:
+            return self.severity_order.index(severity)
+        return len(self.severity_order)
+
+    def _retry_delay_sql(self):
+        """SQL for the backoff delay after the current attempts count."""
+        return f"MIN({float(self.max_backoff_seconds)}, {float(self.backoff_seconds)} * (1 << MIN(attempts, 30)))"
+
+    def enqueue(self, alerts):
+        now = time.time()
+        rows = []
+        for alert in alerts:
+            fingerprint = alert_fingerprint(alert)
+            rows.append((
+                fingerprint,
+                int(fingerprint[:8], 16) % self.partitions,
+                self._priority(alert),
+                json.dumps(alert, default=str),
+                now
+            ))
+
+        with self._transaction():
+            before = self._db.total_changes
+            # Seeing a failed alert again re-opens it, so an outage never drops it for good
+            self._db.executemany(
+                "INSERT INTO alerts (fingerprint, partition, priority, payload, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (fingerprint) DO UPDATE SET state = 'pending', attempts = 0, retry_at = 0 "
+                "WHERE alerts.state = 'failed'",
+                rows
+            )
+            return self._db.total_changes - before
+
+    def acquire_partitions(self, worker_id):
+        now = time.time()
+        expires = now + self.lease_seconds
+
+        with self._transaction():
+            self._db.execute(
+                "INSERT INTO workers (worker_id, heartbeat_expires) VALUES (?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE SET heartbeat_expires = excluded.heartbeat_expires",
+                (worker_id, expires)
+            )
+            self._db.execute("DELETE FROM workers WHERE heartbeat_expires <= ?", (now,))
+            live_workers = self._db.execute("SELECT COUNT(*) FROM workers").fetchone()[0]
+            fair_share = math.ceil(self.partitions / max(1, live_workers))
+
+            self._db.execute(
+                "UPDATE partitions SET lease_expires = ? WHERE owner = ?", (expires, worker_id)
+            )
+
+            # Free every worker's surplus right away, so a worker that just joined
+            # gets its share now rather than after the others' next heartbeat.
+            # Alerts already in flight keep their own leases and are not affected.
+            holdings = self._db.execute(
+                "SELECT owner, COUNT(*) FROM partitions WHERE owner IS NOT NULL AND lease_expires > ? "
+                "GROUP BY owner", (now,)
+            ).fetchall()
+            for owner, count in holdings:
+                if count > fair_share:
+                    self._db.execute(
+                        "UPDATE partitions SET owner = NULL, lease_expires = 0 WHERE partition IN ("
+                        "SELECT partition FROM partitions WHERE owner = ? ORDER BY partition DESC LIMIT ?)",
+                        (owner, count - fair_share)
+                    )
+
+            owned = [row[0] for row in self._db.execute(
+                "SELECT partition FROM partitions WHERE owner = ? ORDER BY partition", (worker_id,)
+            )]
+
+            if len(owned) < fair_share:
+                free = [row[0] for row in self._db.execute(
+                    "SELECT partition FROM partitions "
+                    "WHERE (owner IS NULL OR lease_expires <= ?) ORDER BY partition LIMIT ?",
+                    (now, fair_share - len(owned))
+                )]
+                self._db.executemany(
+                    "UPDATE partitions SET owner = ?, lease_expires = ? WHERE partition = ?",
+                    [(worker_id, expires, partition) for partition in free]
+                )
+                owned.extend(free)
+
+        return sorted(owned)
+
+    def claim(self, worker_id, limit=50):
+        now = time.time()
+
+        with self._transaction():
+            # An expired lease means its worker died mid-alert. That counts as a
+            # failed attempt, so an alert that keeps killing workers gets parked.
+            self._db.execute(
+                "UPDATE alerts SET lease_owner = NULL, lease_expires = NULL, attempts = attempts + 1, "
+                f"retry_at = ? + {self._retry_delay_sql()}, "
+                "state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+                "WHERE state = 'leased' AND lease_expires <= ? "
+                "AND partition IN (SELECT partition FROM partitions WHERE owner = ? AND lease_expires > ?)",
+                (now, self.max_attempts, now, worker_id, now)
+            )
+            rows = self._db.execute(
+                "SELECT a.fingerprint, a.payload, a.enqueued_at FROM alerts a "
+                "JOIN partitions p ON p.partition = a.partition "
+                "WHERE p.owner = ? AND p.lease_expires > ? "
+                "AND a.state = 'pending' AND a.retry_at <= ? "
+                "ORDER BY a.priority, a.enqueued_at LIMIT ?",
+                (worker_id, now, now, limit)
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE alerts SET state = 'leased', lease_owner = ?, lease_expires = ? WHERE fingerprint = ?",
+                [(worker_id, now + self.lease_seconds, fingerprint) for fingerprint, _, _ in rows]
+            )
+
+        return [
+            (fingerprint, json.loads(payload), enqueued_at)
+            for fingerprint, payload, enqueued_at in rows
+        ]
+
+    def renew(self, worker_id, fingerprints):
+        expires = time.time() + self.lease_seconds
+        kept = []
+
+        with self._transaction():
+            for fingerprint in fingerprints:
+                cursor = self._db.execute(
+                    "UPDATE alerts SET lease_expires = ? "
+                    "WHERE fingerprint = ? AND state = 'leased' AND lease_owner = ?",
+                    (expires, fingerprint, worker_id)
+                )
+                if cursor.rowcount == 1:
+                    kept.append(fingerprint)
+
+        return kept
+
+    def ack(self, worker_id, fingerprint):
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE alerts SET state = 'done', lease_owner = NULL, lease_expires = NULL, done_at = ? "
+                "WHERE fingerprint = ? AND state = 'leased' AND lease_owner = ?",
+                (time.time(), fingerprint, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def nack(self, worker_id, fingerprint):
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE alerts SET lease_owner = NULL, lease_expires = NULL, attempts = attempts + 1, "
+                f"retry_at = ? + {self._retry_delay_sql()}, "
+                "state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+                "WHERE fingerprint = ? AND state = 'leased' AND lease_owner = ?",
+                (time.time(), self.max_attempts, fingerprint, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def has_open_work(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM alerts WHERE state IN ('pending', 'leased') LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def release(self, worker_id):
+        # Claims no longer charge attempts, so alerts that never started go back as they were
+        with self._transaction():
+            self._db.execute(
+                "UPDATE alerts SET state = 'pending', lease_owner = NULL, lease_expires = NULL "
+                "WHERE state = 'leased' AND lease_owner = ?",
+                (worker_id,)
+            )
+            self._db.execute(
+                "UPDATE partitions SET owner = NULL, lease_expires = 0 WHERE owner = ?", (worker_id,)
+            )
+            self._db.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def stats(self):
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        with self._lock:
+            for state, count in self._db.execute("SELECT state, COUNT(*) FROM alerts GROUP BY state"):
+                counts[state] = count
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT under the connection lock, rolling back on error."""
+
+    def __init__(self, db, lock):
+        self._db = db
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._db.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._lock.release()
+            raise
+        return self._db
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False